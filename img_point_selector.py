@@ -1,4 +1,6 @@
 import sys
+import time
+import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.image as mpimg
 from matplotlib.patches import Circle
@@ -6,28 +8,79 @@ from matplotlib.lines import Line2D
 
 def collect_points_with_zoom(image_path, output_path="points.py", zoom=4, radius=20):
     img = mpimg.imread(image_path)
+    # Convert float RGB(A) (e.g. from PNGs, in [0, 1]) once to uint8, so drawing skips the
+    # conversion. Integer and 2-D (colormapped) images are left as they are
+    if img.dtype.kind == 'f' and img.ndim == 3:
+        img = (np.clip(img, 0, 1) * 255).astype(np.uint8)
+    img = np.ascontiguousarray(img)
+    H, W = img.shape[0], img.shape[1]
+    pad = radius * 2
+    # Zoom window size, square unless the image is smaller than the window
+    win_w, win_h = min(2 * pad, W), min(2 * pad, H)
     points = []
 
+    # Don't schedule redraws while the artists are set up, plt.show() renders once
+    plt.ioff()
+
     fig, ax = plt.subplots()
     ax.imshow(img)
     ax.set_autoscale_on(False)
     ax.set_title("Click to select points. Close window when done.")
 
     # Circle around cursor on main image
-    circ = Circle((0, 0), radius, color='red', fill=False, lw=1)
+    circ = Circle((0, 0), radius, color='red', fill=False, lw=1, animated=True)
     ax.add_patch(circ)
 
+    # Selected points, drawn as a single blitted scatter
+    pts_scatter = ax.scatter([], [], c='red', s=20, animated=True)
+
     # Fixed zoom inset in top-left
     zoom_ax = fig.add_axes([0.05, 0.75, 0.2, 0.2])
     zoom_ax.axis('off')
-    zoom_im = zoom_ax.imshow(img, interpolation='nearest')
+    zoom_im = zoom_ax.imshow(img[:win_h, :win_w], interpolation='nearest', animated=True)
+    # Blitting never recomputes the inset's box (apply_aspect only runs in a full draw), so the
+    # view must already have the window's shape when the figure is first drawn
+    zoom_ax.set_xlim(0, win_w)
+    zoom_ax.set_ylim(win_h, 0)
 
     # Crosshair lines in zoom as Line2D objects
-    hline = Line2D([0, 0], [0, 0], color='red', lw=1)
-    vline = Line2D([0, 0], [0, 0], color='red', lw=1)
+    hline = Line2D([0, 0], [0, 0], color='red', lw=1, animated=True)
+    vline = Line2D([0, 0], [0, 0], color='red', lw=1, animated=True)
     zoom_ax.add_line(hline)
     zoom_ax.add_line(vline)
 
+    # Motion events are deduplicated per pixel and throttled to ~60Hz to avoid flooding the event loop.
+    # A throttled position is kept pending and rendered by a single-shot timer, so the display never
+    # stays behind the cursor
+    min_dt = 1 / 60
+    last_t = [0.0]
+    last_xy = [None]  # Last rendered position
+    pending_xy = [None]
+    flush_timer = fig.canvas.new_timer(interval=int(min_dt * 1000))
+    flush_timer.single_shot = True
+
+    # Static background (everything but the animated artists), used for blitting
+    bg = [None]
+
+    def draw_animated():
+        ax.draw_artist(pts_scatter)
+        ax.draw_artist(circ)
+        zoom_ax.draw_artist(zoom_im)
+        zoom_ax.draw_artist(hline)
+        zoom_ax.draw_artist(vline)
+
+    def blit():
+        if bg[0] is None:
+            return
+        fig.canvas.restore_region(bg[0])
+        draw_animated()
+        fig.canvas.blit(ax.bbox)
+        fig.canvas.blit(zoom_ax.bbox)
+
+    def ondraw(event):
+        bg[0] = fig.canvas.copy_from_bbox(fig.bbox)
+        draw_animated()
+
     def onclick(event):
         if event.inaxes != ax:
             return
@@ -35,8 +88,12 @@ def collect_points_with_zoom(image_path, output_path="points.py", zoom=4, radius
             x, y = int(event.xdata), int(event.ydata)
             points.append((x, y))
             print(f"Point: ({x}, {y})")
-            ax.plot(x, y, 'ro')
-            fig.canvas.draw_idle()
+            pts_scatter.set_offsets(np.array(points))
+            blit()
+
+    def onclose(event):
+        # Make the points part of the regular figure again
+        pts_scatter.set_animated(False)
 
     def onmotion(event):
         if event.inaxes != ax:
@@ -44,18 +101,42 @@ def collect_points_with_zoom(image_path, output_path="points.py", zoom=4, radius
         if event.xdata is None or event.ydata is None:
             return
         x, y = int(event.xdata), int(event.ydata)
+        if last_xy[0] == (x, y):
+            pending_xy[0] = None
+            return
+        if time.monotonic() - last_t[0] < min_dt:
+            if pending_xy[0] is None:
+                flush_timer.start()
+            pending_xy[0] = (x, y)
+            return
+        pending_xy[0] = None
+        render(x, y)
+
+    def flush():
+        if pending_xy[0] is not None:
+            xy, pending_xy[0] = pending_xy[0], None
+            render(*xy)
+
+    def render(x, y):
+        last_t[0] = time.monotonic()
+        last_xy[0] = (x, y)
 
         # Update circle on main image
         circ.center = (x, y)
     
-        # Define patch boundaries
-        pad = radius * 2
-        y0, y1 = max(0, y - pad), min(img.shape[0], y + pad)
-        x0, x1 = max(0, x - pad), min(img.shape[1], x + pad)
+        # Define patch boundaries, shifted back inside the image at the edges so the window keeps its shape
+        y0 = min(max(0, y - pad), H - win_h)
+        x0 = min(max(0, x - pad), W - win_w)
+        y1, x1 = y0 + win_h, x0 + win_w
         patch = img[y0:y1, x0:x1]
 
-        # Set extent to match image coordinates
-        zoom_im.set_data(patch)
+        # Only upload as many pixels as the inset can display (strided view, no copy)
+        target_px = max(1, int(zoom_ax.bbox.height))
+        s = max(1, patch.shape[0] // target_px)
+
+        # Set extent to match image coordinates. Only the patch is uploaded: imshow processes the
+        # whole array on every draw, regardless of the view limits
+        zoom_im.set_data(patch[::s, ::s])
         zoom_im.set_extent([x0, x1, y1, y0])  # notice y1,y0 to flip vertically
         zoom_ax.set_xlim(x0, x1)
         zoom_ax.set_ylim(y1, y0)
@@ -64,11 +145,14 @@ def collect_points_with_zoom(image_path, output_path="points.py", zoom=4, radius
         hline.set_data([x0, x1], [y, y])
         vline.set_data([x, x], [y0, y1])
 
-        fig.canvas.draw_idle()
+        blit()
 
 
     fig.canvas.mpl_connect('button_press_event', onclick)
     fig.canvas.mpl_connect('motion_notify_event', onmotion)
+    fig.canvas.mpl_connect('draw_event', ondraw)
+    fig.canvas.mpl_connect('close_event', onclose)
+    flush_timer.add_callback(flush)
 
     plt.show()
 
@@ -14,6 +14,8 @@ Ensure the directory `~/.ssh/controlmasters/` exists.
 """
 
 from argparse import ArgumentParser, REMAINDER
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import csv
 import shutil
 from git import Repo
 from pathlib import Path
@@ -21,11 +23,15 @@ from termcolor import colored
 from tqdm import tqdm
 from tqdm.contrib.logging import logging_redirect_tqdm
 import logging
+import os
+import re
+import subprocess
 import sys
 
 USER = "rw244-2025"
 TEMPLATE_REPO_URL = "{user}@gitolite.cs.sun.ac.za:{su_number}/{project_name}"
 CLONE_DIR = Path("repos").resolve()
+MAX_WORKERS = 16  # Concurrent git operations (all share the SSH ControlMaster connection)
 
 
 class ColouredFormatter(logging.Formatter):
@@ -45,6 +51,8 @@ class ColouredFormatter(logging.Formatter):
         :param highlights: The dictionary of words and colours to highlight them, defaults to {}
         :type highlights: dict, optional
 
+        Highlights that are log level names (e.g. 'INFO') only colour the record's level, other highlights are applied to the whole output.
+
         The args and kwargs are passed to the superclass. See [`logging.Formatter`](https://docs.python.org/3/library/logging.html#logging.Formatter) for more information.
         """
         super().__init__(*args, **kwargs)
@@ -54,19 +62,89 @@ class ColouredFormatter(logging.Formatter):
         for text, color in highlights.items():
             self.replacer[text] = colored(text, color)
 
+        # Level names are looked up per record, everything else needs a scan of the output
+        self._levels = {
+            text: highlight
+            for text, highlight in self.replacer.items()
+            if isinstance(logging.getLevelName(text), int)
+        }
+        others = [text for text in self.replacer if text not in self._levels]
+
+        # Single-pass pattern over the other highlights (longest first, so overlapping words match fully)
+        self._pattern = None
+        if others:
+            self._pattern = re.compile(
+                "|".join(re.escape(text) for text in sorted(others, key=len, reverse=True))
+            )
+
     def format(self, record: logging.LogRecord) -> str:
         out = super().format(record)
-        for text, highlight in self.replacer.items():
-            out = out.replace(text, highlight)
+        level = self._levels.get(record.levelname)
+        if level:
+            # Replace after formatting (not on the record) so padding like %(levelname)-8s is kept
+            out = out.replace(record.levelname, level, 1)
+        if self._pattern:
+            out = self._pattern.sub(lambda m: self.replacer[m.group(0)], out)
         return out
 
 
-def repo_2_su(repo: Repo) -> str:
-    return Path(str(repo.working_tree_dir)).name
+def repo_2_su(repo_path: str | Path) -> str:
+    return os.path.basename(repo_path)
+
+
+def _git(repo_dir, *args: str) -> str:
+    """
+    Run a git command in the specified directory without going through GitPython.
+
+    :param repo_dir: The working tree of the repository.
+    :return: The stdout of the command.
+    :raises RuntimeError: If the command exits with a non-zero status.
+    """
+    try:
+        result = subprocess.run(
+            ["git", "-C", str(repo_dir), *args],
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"git {' '.join(args)}: {e.stderr.strip()}") from e
+    return result.stdout
+
+
+def _fan_out(fn, items):
+    """
+    Call `fn` on every item with a thread pool, yielding `(item, error)` pairs as they complete.
+    `error` is None if the call succeeded.
+
+    The first item is run on its own, so the SSH ControlMaster connection is established (and the
+    password entered once) before the remaining workers share it. Otherwise every worker would find
+    no master socket and open, and prompt for, its own connection.
+    """
+    items = list(items)
+    if not items:
+        return
+
+    with tqdm(total=len(items)) as progress:
+        try:
+            fn(items[0])
+            error = None
+        except Exception as e:
+            error = e
+        progress.update()
+        yield items[0], error
+
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            futures = {executor.submit(fn, item): item for item in items[1:]}
+            for future in as_completed(futures):
+                progress.update()
+                yield futures[future], future.exception()
 
 
 class ProjectRepos:
-    def __init__(self, su_numbers: set[str], project_name: str, dry_run=False):
+    def __init__(
+        self, su_numbers: set[str], project_name: str, dry_run=False, shallow=False
+    ):
 
         # Initialize instance variables
         self.su_numbers = su_numbers
@@ -74,9 +152,10 @@ class ProjectRepos:
         self.repo_dir = CLONE_DIR / project_name
 
         self.dry_run = dry_run
+        self.shallow = shallow
 
         # Setup
-        self.repos: set[Repo] = set()
+        self.repos: dict[str, Path] = {}  # SU number -> repository path
         self.repo_dir.mkdir(parents=True, exist_ok=True)
         self.locate()
 
@@ -101,11 +180,11 @@ class ProjectRepos:
         Loads the existing directories into self.repos.
         """
 
-        self.repos = set(
-            Repo(repo_dir)
+        self.repos = {
+            repo_2_su(repo_dir): repo_dir
             for repo_dir in self.repo_dir.iterdir()
             if repo_dir.is_dir() and (repo_dir / ".git").exists()
-        )
+        }
 
         if len(self.repos) == 0:
             logging.warning("No repositories found. Please clone first.")
@@ -114,12 +193,18 @@ class ProjectRepos:
                 f"Located {len(self.repos)}/{len(self.su_numbers)} repositories in {self.repo_dir.resolve()}"
             )
 
+    def _repo(self, repo_path: Path) -> Repo:
+        """
+        Construct the GitPython object for a repository, only needed for object introspection.
+        """
+        return Repo(repo_path)
+
     def missing(self):
         """
         List all missing repositories for the specified student numbers and project name.
         """
 
-        missing_repos = self.su_numbers - set(repo_2_su(repo) for repo in self.repos)
+        missing_repos = self.su_numbers - self.repos.keys()
         if not missing_repos:
             logging.info("No missing repositories found.")
         else:
@@ -131,6 +216,10 @@ class ProjectRepos:
         """
         Clone the repositories for the specified student numbers and project name.
         Only non-existing repositories will be cloned.
+
+        Clones are partial (`--filter=blob:none`): the full commit history is fetched, but file
+        contents are only downloaded when a commit is checked out. If `shallow` is set, only the
+        latest commit is fetched (`--depth 1`), which breaks checking out or resetting to older commits.
         """
 
         if len(self.repos) > 0:
@@ -138,24 +227,33 @@ class ProjectRepos:
                 "Only non-existing repositories will be cloned. If you wish to update the existing repositories, use 'pull' instead"
             )
 
-        su_numbers = self.su_numbers - set(repo_2_su(repo) for repo in self.repos)
+        su_numbers = self.su_numbers - self.repos.keys()
 
-        for su_number in tqdm(su_numbers):
-            if self.dry_run:
+        if self.dry_run:
+            for su_number in su_numbers:
                 logging.info(
                     f"Dry run: {TEMPLATE_REPO_URL.format(su_number=su_number, project_name=self.project_name, user=USER)}"
                 )
-                continue
-
-            try:
-                repo = Repo.clone_from(
-                    TEMPLATE_REPO_URL.format(
-                        su_number=su_number, project_name=self.project_name, user=USER
-                    ),
-                    self.repo_dir / su_number,
-                )
-                self.repos.add(repo)
-            except Exception as e:
+            return
+
+        clone_args = ["clone", "--quiet", "--filter=blob:none"]
+        if self.shallow:
+            clone_args += ["--depth", "1"]
+
+        def clone_one(su_number):
+            _git(
+                self.repo_dir,
+                *clone_args,
+                TEMPLATE_REPO_URL.format(
+                    su_number=su_number, project_name=self.project_name, user=USER
+                ),
+                su_number,
+            )
+
+        for su_number, e in _fan_out(clone_one, su_numbers):
+            if e is None:
+                self.repos[su_number] = self.repo_dir / su_number
+            else:
                 tqdm.write(
                     f"An error occurred while cloning the repository for {su_number}: {e}",
                     file=sys.stderr,
@@ -173,49 +271,60 @@ class ProjectRepos:
                 "No repositories found. If you wish to clone new repos, use 'clone' instead"
             )
 
-        for repo in tqdm(self.repos):
-            if self.dry_run:
-                logging.info(f"Dry run [pull]: {repo_2_su(repo)}")
-                continue
+        if self.dry_run:
+            for su_number in self.repos:
+                logging.info(f"Dry run [pull]: {su_number}")
+            return
+
+        def pull_one(su_number):
+            _git(self.repos[su_number], "pull", "--ff-only", "--no-stat", "--quiet")
 
-            try:
-                repo.git.pull()
-            except Exception as e:
+        for su_number, e in _fan_out(pull_one, self.repos):
+            if e is not None:
                 tqdm.write(
-                    f"An error occurred while pulling the repository for {repo_2_su(repo)}: {e}",
+                    f"An error occurred while pulling the repository for {su_number}: {e}",
                     file=sys.stderr,
                 )
 
     def switch(self, branch_like: str):
 
-        successes = set()
-        for repo in tqdm(self.repos):
-            if self.dry_run:
-                logging.info(f"Dry run [switch]: {repo_2_su(repo)}")
-                continue
+        successes = {}
+        if self.dry_run:
+            for su_number in self.repos:
+                logging.info(f"Dry run [switch]: {su_number}")
+        else:
 
-            try:
-                repo.git.checkout(branch_like)
-                successes.add(repo)
-            except Exception as e:
-                tqdm.write(
-                    f"An error occurred while switching branches for {repo_2_su(repo)}: {e}",
-                    file=sys.stderr,
-                )
+            def switch_one(su_number):
+                _git(self.repos[su_number], "checkout", branch_like)
+
+            for su_number, e in _fan_out(switch_one, self.repos):
+                if e is None:
+                    successes[su_number] = self.repos[su_number]
+                else:
+                    tqdm.write(
+                        f"An error occurred while switching branches for {su_number}: {e}",
+                        file=sys.stderr,
+                    )
 
         logging.info(
             f"Successfully switched branches for {len(successes)}/{len(self.repos)}/{len(self.su_numbers)} switched/total repos/students."
         )
         self._export(successes, "switched_repos.csv")
 
-    def _export(self, repos, out_file):
+    def _export(self, repos: dict[str, Path], out_file):
         """
-        Export the specified repositories to a file.
+        Export the specified repositories (SU number -> path) to a file.
         """
         logging.info(f"Exporting {len(repos)} repositories to {out_file}")
-        with open(out_file, "w") as f:
-            for repo in tqdm(repos):
-                f.write(f"{repo_2_su(repo)},{repo.head.commit.hexsha}\n")
+
+        def row(su_number):
+            return f"{su_number},{self._repo(repos[su_number]).head.commit.hexsha}\n"
+
+        # map preserves input order, so sorting makes the output deterministic
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            rows = list(tqdm(executor.map(row, sorted(repos)), total=len(repos)))
+        with open(out_file, "w", buffering=1 << 20) as f:
+            f.writelines(rows)
 
     def export_commits(self, out_file: str):
         """
@@ -235,9 +344,11 @@ class ProjectRepos:
         """
 
         checked = set()
-        with open(in_file, "r") as f:
-            for line in tqdm(f.readlines()):
-                su_number, commit_hash = line.strip().split(",")
+        with open(in_file, "r", newline="") as f:
+            for row in tqdm(csv.reader(f)):
+                if not row:
+                    continue
+                su_number, commit_hash = (field.strip() for field in row)
                 repo = self.repo_dir / su_number
                 if not repo.exists():
                     logging.warning(f"Repository for {su_number} does not exist.")
@@ -279,9 +390,11 @@ class ProjectRepos:
         """
 
         checked = set()
-        with open(in_file, "r") as f:
-            for line in tqdm(f.readlines()):
-                su_number, commit_hash = line.strip().split(",")
+        with open(in_file, "r", newline="") as f:
+            for row in tqdm(csv.reader(f)):
+                if not row:
+                    continue
+                su_number, commit_hash = (field.strip() for field in row)
                 repo = self.repo_dir / su_number
                 if not repo.exists():
                     logging.warning(f"Repository for {su_number} does not exist.")
@@ -331,6 +444,11 @@ if __name__ == "__main__":
         help="If set, will not perform any cloning, just print the URLs.",
         action="store_true",
     )
+    parser.add_argument(
+        "--shallow",
+        help="If set, 'clone' will only fetch the latest commit (checking out older commits will not work).",
+        action="store_true",
+    )
     parser.add_argument(
         "--log-level",
         help="Set the logging level.",
@@ -365,7 +483,7 @@ if __name__ == "__main__":
 
     # Logging
 
-    logging.basicConfig(level=logging.INFO)
+    logging.basicConfig(level=args.log_level)
     formatter = ColouredFormatter(
         "%(levelname)-8s| %(message)s",
         highlights={
@@ -374,7 +492,6 @@ if __name__ == "__main__":
             "INFO": "green",
             "WARNING": "yellow",
             "ERROR": "red",
-            "EXCEPTION": "red",
             "CRITICAL": "red",
         },
     )
@@ -386,7 +503,9 @@ if __name__ == "__main__":
     with open(args.student_numbers_file, "r") as f:
         su_numbers = {line.strip() for line in f if line.strip()}
 
-    projects = ProjectRepos(su_numbers, args.project_name, dry_run=args.dry_run)
+    projects = ProjectRepos(
+        su_numbers, args.project_name, dry_run=args.dry_run, shallow=args.shallow
+    )
     with logging_redirect_tqdm():
         projects.run(args.subcommand)(*args.subcommand_args)
 